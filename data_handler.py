@@ -1,18 +1,58 @@
+import atexit
+import hashlib
+import json
 import os
 import sqlite3
-from typing import Any, Dict, List, Tuple
+import sys
+import threading
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; stdlib json is the fallback
+    orjson = None
 
 FALLBACK_CRON = "*/30 * * * *"
 DEFAULT_DB_PATH = "data/plugins/astrbot_plugin_simple_rss/srss.db"
 DEFAULT_DATA_PATH = DEFAULT_DB_PATH
+DEFAULT_RECENT_IDS_LIMIT = 20
+# (url, feed, sub) with feed/sub being the live dicts inside DataHandler.data
+SubscriptionEntry = Tuple[str, Dict[str, Any], Dict[str, Any]]
+
+SUBSCRIPTION_MIGRATED_COLUMNS = (
+    ("recent_ids", "TEXT NOT NULL DEFAULT '[]'"),
+    ("etag", "TEXT NOT NULL DEFAULT ''"),
+    ("last_modified", "TEXT NOT NULL DEFAULT ''"),
+)
+
+
+def _dumps_json(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _loads_json(raw: str) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
 
 
 class DataHandler:
-    def __init__(self, path: str = DEFAULT_DB_PATH):
+    def __init__(self, path: str = DEFAULT_DB_PATH, recent_ids_limit: int = DEFAULT_RECENT_IDS_LIMIT):
         self.path = path
+        self.recent_ids_limit = max(1, int(recent_ids_limit))
         self._ensure_parent_dir()
+        self._lock = threading.RLock()
+        self._conn = self._connect()
+        self._closed = False
+        atexit.register(self.close)
         self._init_db()
-        self.data = self._load_data()
+        self.data = self._load_from_db()
+        self._persisted = self._snapshot(self.data)
+        self._persisted_hash = self._digest(self._persisted)
+        self._dirty = False
 
     def _ensure_parent_dir(self) -> None:
         parent = os.path.dirname(self.path)
@@ -20,12 +60,35 @@ class DataHandler:
             os.makedirs(parent, exist_ok=True)
 
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.path, timeout=30)
+        # the connection is shared with the plugin's save thread, guarded by self._lock
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
         conn.execute("PRAGMA foreign_keys = ON")
+        # WAL + synchronous=NORMAL may lose the last few milliseconds of writes on
+        # power loss, which is acceptable for feed metadata in exchange for far
+        # cheaper commits.
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -20000")
+        conn.execute("PRAGMA mmap_size = 134217728")
+        conn.execute("PRAGMA busy_timeout = 30000")
+        conn.execute("PRAGMA wal_autocheckpoint = 1000")
         return conn
 
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            # drop the atexit reference so a reloaded plugin does not pin old handlers
+            atexit.unregister(self.close)
+            try:
+                self._conn.execute("PRAGMA optimize")
+            finally:
+                self._conn.close()
+
     def _init_db(self) -> None:
-        with self._connect() as conn:
+        with self._lock, self._conn as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
             conn.executescript(
                 """
                 CREATE TABLE IF NOT EXISTS feeds (
@@ -39,36 +102,79 @@ class DataHandler:
                     channel TEXT NOT NULL,
                     cron_expr TEXT NOT NULL DEFAULT '',
                     last_update INTEGER NOT NULL DEFAULT 0,
+                    recent_ids TEXT NOT NULL DEFAULT '[]',
+                    etag TEXT NOT NULL DEFAULT '',
+                    last_modified TEXT NOT NULL DEFAULT '',
                     PRIMARY KEY (url, channel),
                     FOREIGN KEY (url) REFERENCES feeds(url) ON DELETE CASCADE
                 );
 
-                CREATE TABLE IF NOT EXISTS subscription_recent_ids (
-                    url TEXT NOT NULL,
-                    channel TEXT NOT NULL,
-                    position INTEGER NOT NULL,
-                    item_id TEXT NOT NULL,
-                    PRIMARY KEY (url, channel, position),
-                    FOREIGN KEY (url, channel) REFERENCES subscriptions(url, channel) ON DELETE CASCADE
-                );
-
-                CREATE INDEX IF NOT EXISTS idx_subscriptions_channel
-                ON subscriptions(channel);
-
-                CREATE INDEX IF NOT EXISTS idx_recent_ids_subscription
-                ON subscription_recent_ids(url, channel);
+                DROP INDEX IF EXISTS idx_subscriptions_channel;
                 """
             )
+            conn.execute("BEGIN IMMEDIATE")
+            self._migrate_columns(conn)
+            self._migrate_recent_ids(conn)
+        with self._lock:
+            self._conn.execute("ANALYZE")
+
+    def _migrate_columns(self, conn: sqlite3.Connection) -> None:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(subscriptions)")}
+        for name, definition in SUBSCRIPTION_MIGRATED_COLUMNS:
+            if name not in columns:
+                conn.execute(f"ALTER TABLE subscriptions ADD COLUMN {name} {definition}")
+
+    def _migrate_recent_ids(self, conn: sqlite3.Connection) -> None:
+        legacy = conn.execute(
+            """
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'table' AND name = 'subscription_recent_ids'
+            """
+        ).fetchone()
+        if legacy is None:
+            return
+
+        recent_map: Dict[Tuple[str, str], List[str]] = {}
+        for url, channel, item_id in conn.execute(
+            """
+            SELECT url, channel, item_id
+            FROM subscription_recent_ids
+            ORDER BY url, channel, position
+            """
+        ):
+            recent_map.setdefault((url, channel), []).append(item_id)
+
+        conn.executemany(
+            "UPDATE subscriptions SET recent_ids = ? WHERE url = ? AND channel = ?",
+            [
+                (_dumps_json(ids), url, channel)
+                for (url, channel), ids in recent_map.items()
+            ],
+        )
+        conn.execute("DROP TABLE subscription_recent_ids")
 
     def _normalize_recent_ids(self, raw: Any) -> List[str]:
-        if not isinstance(raw, list):
+        if not isinstance(raw, (list, tuple, deque)):
+            return []
+        values = (str(item).strip() for item in raw)
+        return list(dict.fromkeys(value for value in values if value))
+
+    def _decode_recent_ids(self, raw: Any) -> List[str]:
+        try:
+            loaded = _loads_json(raw or "[]")
+        except Exception:
             return []
-        unique: List[str] = []
-        for item in raw:
-            value = str(item).strip()
-            if value and value not in unique:
-                unique.append(value)
-        return unique
+        return loaded if isinstance(loaded, list) else []
+
+    def _attach_recent(self, sub: Dict[str, Any]) -> Dict[str, Any]:
+        # newest first; the set mirrors the deque for O(1) membership checks, so the
+        # deque must not hold duplicates or evicting one copy would unmark the rest
+        limit = self.recent_ids_limit
+        unique = self._normalize_recent_ids(sub.get("recent_ids"))
+        recent = deque(unique[:limit], maxlen=limit)
+        sub["recent_ids"] = recent
+        sub["_recent_set"] = set(recent)
+        return sub
 
     def _safe_int(self, value: Any) -> int:
         try:
@@ -76,97 +182,68 @@ class DataHandler:
         except Exception:
             return 0
 
-    def _normalize_feed_entry(self, feed: Any) -> Dict[str, Any]:
-        if not isinstance(feed, dict):
-            feed = {}
-
-        subscribers_raw = feed.get("subscribers", {})
-        subscribers: Dict[str, Dict[str, Any]] = {}
-        if isinstance(subscribers_raw, dict):
-            for channel, sub in subscribers_raw.items():
-                if not isinstance(sub, dict):
-                    continue
-                subscribers[str(channel)] = {
-                    "cron_expr": str(sub.get("cron_expr") or FALLBACK_CRON),
-                    "last_update": self._safe_int(sub.get("last_update")),
-                    "recent_ids": self._normalize_recent_ids(sub.get("recent_ids")),
-                }
-
-        return {
-            "title": str(feed.get("title") or ""),
-            "description": str(feed.get("description") or ""),
-            "subscribers": subscribers,
-        }
-
-    def _normalize_data(self, loaded: Any) -> Dict[str, Any]:
-        normalized: Dict[str, Any] = {"feeds": {}}
-        if not isinstance(loaded, dict):
-            return normalized
-
-        feeds = loaded.get("feeds", {})
-        if not isinstance(feeds, dict):
-            return normalized
-
-        for url, feed in feeds.items():
-            url_key = str(url).strip()
-            if not url_key:
-                continue
-            normalized["feeds"][url_key] = self._normalize_feed_entry(feed)
-
-        return normalized
-
-    def _load_data(self) -> Dict[str, Any]:
+    def _load_from_db(self) -> Dict[str, Any]:
         feeds: Dict[str, Dict[str, Any]] = {}
-        sub_map: Dict[Tuple[str, str], Dict[str, Any]] = {}
-        with self._connect() as conn:
-            for url, title, description in conn.execute(
-                "SELECT url, title, description FROM feeds ORDER BY rowid"
-            ):
-                feeds[url] = {
-                    "title": str(title or ""),
-                    "description": str(description or ""),
-                    "subscribers": {},
-                }
-
-            for url, channel, cron_expr, last_update in conn.execute(
+        by_channel: Dict[str, List[SubscriptionEntry]] = {}
+        with self._lock, self._conn as conn:
+            rows = conn.execute(
                 """
-                SELECT url, channel, cron_expr, last_update
-                FROM subscriptions
-                ORDER BY rowid
+                SELECT f.url, f.title, f.description,
+                       s.channel, s.cron_expr, s.last_update, s.recent_ids,
+                       s.etag, s.last_modified
+                FROM feeds f
+                LEFT JOIN subscriptions s ON s.url = f.url
+                ORDER BY f.rowid, s.rowid
                 """
-            ):
-                feed_entry = feeds.setdefault(
-                    url,
-                    {"title": "", "description": "", "subscribers": {}},
+            )
+            for (
+                url,
+                title,
+                description,
+                channel,
+                cron_expr,
+                last_update,
+                recent_ids,
+                etag,
+                last_modified,
+            ) in rows:
+                url = sys.intern(url)
+                feed_entry = feeds.get(url)
+                if feed_entry is None:
+                    feed_entry = feeds[url] = {
+                        "title": str(title or ""),
+                        "description": str(description or ""),
+                        "subscribers": {},
+                    }
+                if channel is None:
+                    continue
+                channel = sys.intern(channel)
+                sub = feed_entry["subscribers"][channel] = self._attach_recent(
+                    {
+                        "cron_expr": str(cron_expr or FALLBACK_CRON),
+                        "last_update": self._safe_int(last_update),
+                        "recent_ids": self._decode_recent_ids(recent_ids),
+                        "etag": str(etag or ""),
+                        "last_modified": str(last_modified or ""),
+                    }
                 )
-                feed_entry["subscribers"][channel] = {
-                    "cron_expr": str(cron_expr or FALLBACK_CRON),
-                    "last_update": self._safe_int(last_update),
-                    "recent_ids": [],
-                }
-                sub_map[(url, channel)] = feed_entry["subscribers"][channel]
-
-            for url, channel, _, item_id in conn.execute(
-                """
-                SELECT url, channel, position, item_id
-                FROM subscription_recent_ids
-                ORDER BY url, channel, position
-                """
-            ):
-                sub = sub_map.get((url, channel))
-                if sub is not None:
-                    sub["recent_ids"].append(item_id)
+                by_channel.setdefault(channel, []).append((url, feed_entry, sub))
 
+        self._by_channel = by_channel
+        self._by_url_channel = {
+            (entry[0], channel): entry
+            for channel, entries in by_channel.items()
+            for entry in entries
+        }
         return {"feeds": feeds}
 
-    def _persist_data(self, data: Dict[str, Any]) -> None:
+    def _snapshot(self, data: Dict[str, Any]) -> Dict[str, Dict[Any, Tuple[Any, ...]]]:
         feeds = data.get("feeds", {})
         if not isinstance(feeds, dict):
             feeds = {}
 
-        feed_rows: List[Tuple[str, str, str]] = []
-        sub_rows: List[Tuple[str, str, str, int]] = []
-        recent_rows: List[Tuple[str, str, int, str]] = []
+        feed_rows: Dict[str, Tuple[str, str]] = {}
+        sub_rows: Dict[Tuple[str, str], Tuple[str, int, str, str, str]] = {}
 
         for url, feed in feeds.items():
             if not isinstance(feed, dict):
@@ -178,7 +255,7 @@ class DataHandler:
 
             title = str(feed.get("title") or "")
             description = str(feed.get("description") or "")
-            feed_rows.append((url_key, title, description))
+            feed_rows[url_key] = (title, description)
 
             subscribers = feed.get("subscribers", {})
             if not isinstance(subscribers, dict):
@@ -190,61 +267,172 @@ class DataHandler:
                 channel_key = str(channel).strip()
                 if not channel_key:
                     continue
-                sub_rows.append(
-                    (
-                        url_key,
-                        channel_key,
-                        str(sub.get("cron_expr") or FALLBACK_CRON),
-                        self._safe_int(sub.get("last_update")),
-                    )
-                )
-                recent_ids = self._normalize_recent_ids(sub.get("recent_ids"))
-                for position, item_id in enumerate(recent_ids):
-                    recent_rows.append((url_key, channel_key, position, item_id))
-
-        with self._connect() as conn:
-            conn.execute("DELETE FROM subscription_recent_ids")
-            conn.execute("DELETE FROM subscriptions")
-            conn.execute("DELETE FROM feeds")
-            if feed_rows:
-                conn.executemany(
-                    "INSERT INTO feeds (url, title, description) VALUES (?, ?, ?)",
-                    feed_rows,
-                )
-            if sub_rows:
-                conn.executemany(
-                    """
-                    INSERT INTO subscriptions (url, channel, cron_expr, last_update)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    sub_rows,
+                sub_rows[(url_key, channel_key)] = (
+                    str(sub.get("cron_expr") or FALLBACK_CRON),
+                    self._safe_int(sub.get("last_update")),
+                    _dumps_json(self._normalize_recent_ids(sub.get("recent_ids"))),
+                    str(sub.get("etag") or ""),
+                    str(sub.get("last_modified") or ""),
                 )
-            if recent_rows:
-                conn.executemany(
-                    """
-                    INSERT INTO subscription_recent_ids (url, channel, position, item_id)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    recent_rows,
+
+        return {"feeds": feed_rows, "subscriptions": sub_rows}
+
+    def _digest(self, snapshot: Dict[str, Dict[Any, Tuple[Any, ...]]]) -> bytes:
+        return hashlib.blake2b(repr(snapshot).encode("utf-8"), digest_size=16).digest()
+
+    def _persist_data(self, current: Dict[str, Dict[Any, Tuple[Any, ...]]]) -> None:
+        previous = self._persisted
+
+        def iter_feed_deletes() -> Iterator[Tuple[str]]:
+            for url in previous["feeds"]:
+                if url not in current["feeds"]:
+                    yield (url,)
+
+        def iter_sub_deletes() -> Iterator[Tuple[str, str]]:
+            for key in previous["subscriptions"]:
+                if key not in current["subscriptions"] and key[0] in current["feeds"]:
+                    yield key
+
+        def iter_feed_rows() -> Iterator[Tuple[str, str, str]]:
+            for url, row in current["feeds"].items():
+                if previous["feeds"].get(url) != row:
+                    yield (url, *row)
+
+        def iter_sub_rows() -> Iterator[Tuple[str, str, str, int, str, str, str]]:
+            for key, row in current["subscriptions"].items():
+                if previous["subscriptions"].get(key) != row:
+                    yield (*key, *row)
+
+        with self._lock, self._conn as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("DELETE FROM feeds WHERE url = ?", iter_feed_deletes())
+            conn.executemany(
+                "DELETE FROM subscriptions WHERE url = ? AND channel = ?",
+                iter_sub_deletes(),
+            )
+            conn.executemany(
+                """
+                INSERT INTO feeds (url, title, description) VALUES (?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = excluded.title,
+                    description = excluded.description
+                """,
+                iter_feed_rows(),
+            )
+            conn.executemany(
+                """
+                INSERT INTO subscriptions (
+                    url, channel, cron_expr, last_update, recent_ids, etag, last_modified
                 )
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url, channel) DO UPDATE SET
+                    cron_expr = excluded.cron_expr,
+                    last_update = excluded.last_update,
+                    recent_ids = excluded.recent_ids,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified
+                """,
+                iter_sub_rows(),
+            )
 
-    def save_data(self) -> None:
-        normalized = self._normalize_data(self.data)
-        self._persist_data(normalized)
-        self.data = normalized
+        self._persisted = current
+        self._persisted_hash = self._digest(current)
+
+    def mark_dirty(self) -> None:
+        self._dirty = True
+
+    def is_dirty(self) -> bool:
+        return self._dirty
+
+    def prepare_save(self) -> Optional[Dict[str, Dict[Any, Tuple[Any, ...]]]]:
+        # Must run on the thread that mutates self.data; the returned snapshot
+        # can then be handed to write_snapshot() on any thread.
+        if not self._dirty:
+            return None
+        self._dirty = False
+        return self._snapshot(self.data)
+
+    def write_snapshot(self, snapshot: Dict[str, Dict[Any, Tuple[Any, ...]]]) -> None:
+        with self._lock:
+            if self._digest(snapshot) == self._persisted_hash:
+                return
+            try:
+                self._persist_data(snapshot)
+            except Exception:
+                self._dirty = True
+                raise
 
-    def list_channel_subscriptions(self, channel: str) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
-        results: List[Tuple[str, Dict[str, Any], Dict[str, Any]]] = []
+    def save_data(self) -> None:
+        snapshot = self.prepare_save()
+        if snapshot is not None:
+            self.write_snapshot(snapshot)
+
+    def add_subscription(
+        self,
+        url: str,
+        channel: str,
+        sub: Dict[str, Any],
+        title: str = "",
+        description: str = "",
+    ) -> Dict[str, Any]:
+        feeds = self.data.setdefault("feeds", {})
+        feed = feeds.get(url)
+        is_new_feed = feed is None
+        if is_new_feed:
+            feed = feeds[url] = {"title": title, "description": description, "subscribers": {}}
+        else:
+            if title:
+                feed["title"] = title
+            if description:
+                feed["description"] = description
+
+        feed.setdefault("subscribers", {})[channel] = self._attach_recent(sub)
+        key = (url, channel)
+        entry = (url, feed, sub)
+        entries = self._by_channel.setdefault(channel, [])
+        previous = self._by_url_channel.get(key)
+        self._by_url_channel[key] = entry
+        if previous is not None:
+            entries[entries.index(previous)] = entry
+        elif is_new_feed:
+            entries.append(entry)
+        else:
+            # keep the channel list in feed order so list indexes survive a reload
+            self._by_channel[channel] = [
+                self._by_url_channel[(u, channel)]
+                for u in feeds
+                if (u, channel) in self._by_url_channel
+            ]
+
+        self.mark_dirty()
+        return feed
+
+    def remove_subscription(self, url: str, channel: str) -> None:
         feeds = self.data.get("feeds", {})
-        if not isinstance(feeds, dict):
-            return results
+        feed = feeds.get(url)
+        if not isinstance(feed, dict):
+            return
 
-        for url, feed in feeds.items():
-            if not isinstance(feed, dict):
-                continue
-            subscribers = feed.get("subscribers", {})
-            if not isinstance(subscribers, dict):
-                continue
-            if channel in subscribers and isinstance(subscribers[channel], dict):
-                results.append((url, feed, subscribers[channel]))
-        return results
+        subscribers = feed.get("subscribers", {})
+        subscribers.pop(channel, None)
+        if not subscribers:
+            feeds.pop(url, None)
+
+        entry = self._by_url_channel.pop((url, channel), None)
+        entries = self._by_channel.get(channel)
+        if entry is not None and entries is not None:
+            entries.remove(entry)
+            if not entries:
+                del self._by_channel[channel]
+
+        self.mark_dirty()
+
+    def get_subscription(self, url: str, channel: str) -> Optional[SubscriptionEntry]:
+        return self._by_url_channel.get((url, channel))
+
+    def iter_subscriptions(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        for (url, channel), (_, _, sub) in self._by_url_channel.items():
+            yield url, channel, sub
+
+    def list_channel_subscriptions(self, channel: str) -> List[SubscriptionEntry]:
+        return list(self._by_channel.get(sys.intern(channel), ()))
@@ -1,9 +1,12 @@
+import asyncio
 import hashlib
 import shlex
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 import astrbot.api.message_components as Comp
@@ -14,10 +17,18 @@ from astrbot.api.star import Context, Star, register
 from .cron_utils import parse_cron_expr, validate_cron_expr
 from .data_handler import FALLBACK_CRON, DataHandler
 from .rss import RSSItem
-from .rss_client import RSSClient
+from .rss_client import NotModified, RSSClient
 
 
 PLUGIN_VERSION = "0.0.5"
+SAVE_DEBOUNCE_SECONDS = 1.0
+MAX_CONCURRENT_FETCHES = 8
+
+
+@lru_cache(maxsize=1024)
+def _fmt_ts(ts: int, tz: tzinfo) -> str:
+    # keyed on the tz object itself: the UTC+8 fallback has no zone name to key on
+    return datetime.fromtimestamp(ts, tz=tz).strftime("%Y.%m.%d %H:%M:%S")
 
 
 @register("astrbot_plugin_simple_rss", "slfk", "最简 RSS 订阅插件", PLUGIN_VERSION)
@@ -30,6 +41,9 @@ class SimpleRSSPlugin(Star):
         self.default_cron_expr = self._read_default_cron_expr()
         self.init_fetch_count = self._read_int_config("init_fetch_count", 20, min_value=1)
         self.poll_fetch_count = self._read_int_config("poll_fetch_count", 5, min_value=1)
+        self.max_concurrent_polls = self._read_int_config(
+            "max_concurrent_polls", MAX_CONCURRENT_FETCHES, min_value=1
+        )
         legacy_desc_max = self._to_int(
             self._config_get("description_max_length", 150), 150, min_value=1
         )
@@ -40,14 +54,29 @@ class SimpleRSSPlugin(Star):
         )
         self.display_tz = self._read_display_timezone()
 
-        self.data_handler = DataHandler()
+        self.data_handler = DataHandler(recent_ids_limit=self.init_fetch_count)
         self.rss_client = RSSClient(desc_max_length=self.desc_max_length)
         self.scheduler = AsyncIOScheduler()
+        # _save_task is only ever a save still in its debounce sleep; once it has
+        # taken a snapshot it moves to _save_writes and is no longer cancelled
+        self._save_task: Optional[asyncio.Task] = None
+        self._save_writes: Set[asyncio.Task] = set()
+        self._poll_sem = asyncio.Semaphore(self.max_concurrent_polls)
+        self._handlers = {
+            "add": self._cmd_add,
+            "ls": self._cmd_ls,
+            "list": self._cmd_ls,
+            "remove": self._cmd_remove,
+            "change": self._cmd_change,
+            "get": self._cmd_get,
+        }
 
     async def initialize(self):
+        # queue every job before start() so they are committed in one pass
+        # instead of waking the scheduler once per subscription
+        self._refresh_scheduler()
         if not self.scheduler.running:
             self.scheduler.start()
-        self._refresh_scheduler()
         logger.info(
             "simple_rss loaded: version=%s get_format=v2 desc_max_length=%s timezone=%s",
             PLUGIN_VERSION,
@@ -58,6 +87,36 @@ class SimpleRSSPlugin(Star):
     async def terminate(self):
         if self.scheduler.running:
             self.scheduler.shutdown(wait=False)
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+        if self._save_writes:
+            await asyncio.gather(*self._save_writes, return_exceptions=True)
+        self.data_handler.save_data()
+        await self.rss_client.close()
+        self.data_handler.close()
+
+    def _request_save(self, delay: float = SAVE_DEBOUNCE_SECONDS) -> None:
+        # a pending save snapshots when its timer fires, so it already covers this
+        # change; re-arming it would let a steady stream of polls postpone the write
+        if self._save_task is not None and not self._save_task.done():
+            return
+        self._save_task = asyncio.create_task(self._schedule_save(delay))
+
+    async def _schedule_save(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        task = asyncio.current_task()
+        if self._save_task is task:
+            self._save_task = None
+        snapshot = self.data_handler.prepare_save()
+        if snapshot is None:
+            return
+        self._save_writes.add(task)
+        try:
+            await asyncio.to_thread(self.data_handler.write_snapshot, snapshot)
+        except Exception as exc:
+            logger.warning(f"保存 RSS 数据失败: {exc}")
+        finally:
+            self._save_writes.discard(task)
 
     def _config_get(self, key: str, default: Any) -> Any:
         if self.config is None:
@@ -117,21 +176,17 @@ class SimpleRSSPlugin(Star):
         if not message:
             return
 
-        lower_msg = message.lower()
-        if not (
-            lower_msg == "/rss"
-            or lower_msg.startswith("/rss ")
-            or lower_msg.startswith("/rss@")
-            or lower_msg == "rss"
-            or lower_msg.startswith("rss ")
-        ):
+        if message[:4].lower() not in ("/rss", "rss ", "rss"):
             return
 
-        try:
-            tokens = shlex.split(message)
-        except ValueError:
-            yield event.plain_result("命令格式错误：引号未闭合。")
-            return
+        if "'" in message or '"' in message or "\\" in message:
+            try:
+                tokens = shlex.split(message)
+            except ValueError:
+                yield event.plain_result("命令格式错误：引号未闭合。")
+                return
+        else:
+            tokens = message.split()
 
         if not tokens:
             return
@@ -146,36 +201,14 @@ class SimpleRSSPlugin(Star):
             yield event.plain_result(self._help_text())
             return
 
-        action = tokens[0].lower()
-        args = tokens[1:]
-
-        if action == "add":
-            result = await self._cmd_add(event, args)
-            yield event.plain_result(result)
-            return
-
-        if action in {"ls", "list"}:
-            result = self._cmd_ls(event, args)
-            yield event.plain_result(result)
-            return
-
-        if action == "remove":
-            result = self._cmd_remove(event, args)
-            yield event.plain_result(result)
-            return
-
-        if action == "change":
-            result = self._cmd_change(event, args)
-            yield event.plain_result(result)
-            return
-
-        if action == "get":
-            results = await self._cmd_get(event, args)
-            for text in results:
-                yield event.plain_result(text)
+        handler = self._handlers.get(tokens[0].lower())
+        if handler is None:
+            yield event.plain_result(self._help_text())
             return
 
-        yield event.plain_result(self._help_text())
+        result = await handler(event, tokens[1:])
+        for text in [result] if isinstance(result, str) else result:
+            yield event.plain_result(text)
 
     def _help_text(self) -> str:
         return (
@@ -220,30 +253,20 @@ class SimpleRSSPlugin(Star):
         latest_ts = max((item.published_ts for item in items), default=0)
         recent_ids = [item.uid for item in items][: self.init_fetch_count]
 
-        feeds = self.data_handler.data.setdefault("feeds", {})
-        feed_entry = feeds.setdefault(
+        feed_entry = self.data_handler.add_subscription(
             url,
+            channel,
             {
-                "title": title,
-                "description": description,
-                "subscribers": {},
+                "cron_expr": cron_expr,
+                "last_update": latest_ts,
+                "recent_ids": recent_ids,
             },
+            title=title,
+            description=description,
         )
 
-        if title:
-            feed_entry["title"] = title
-        if description:
-            feed_entry["description"] = description
-
-        subscribers = feed_entry.setdefault("subscribers", {})
-        subscribers[channel] = {
-            "cron_expr": cron_expr,
-            "last_update": latest_ts,
-            "recent_ids": recent_ids,
-        }
-
-        self.data_handler.save_data()
-        self._refresh_scheduler()
+        self._request_save()
+        self._add_or_update_job(url, channel, cron_expr)
 
         channel_title = feed_entry.get("title") or url
         return (
@@ -251,7 +274,7 @@ class SimpleRSSPlugin(Star):
             f"cron: {cron_expr}\n初始化拉取条数: {self.init_fetch_count}"
         )
 
-    def _cmd_ls(self, event: AstrMessageEvent, args: List[str]) -> str:
+    async def _cmd_ls(self, event: AstrMessageEvent, args: List[str]) -> str:
         if args:
             return "用法: /rss ls"
 
@@ -269,7 +292,7 @@ class SimpleRSSPlugin(Star):
             lines.append(f"cron: {cron_expr}")
         return "\n".join(lines)
 
-    def _cmd_remove(self, event: AstrMessageEvent, args: List[str]) -> str:
+    async def _cmd_remove(self, event: AstrMessageEvent, args: List[str]) -> str:
         if len(args) != 1:
             return "用法: /rss remove <list-index>"
 
@@ -282,18 +305,13 @@ class SimpleRSSPlugin(Star):
         if idx >= len(subs):
             return "索引越界，请先用 /rss ls 查看序号。"
 
-        url, feed, _ = subs[idx]
-        subscribers = feed.get("subscribers", {})
-        subscribers.pop(channel, None)
-
-        if not subscribers:
-            self.data_handler.data.get("feeds", {}).pop(url, None)
-
-        self.data_handler.save_data()
-        self._refresh_scheduler()
+        url, _, _ = subs[idx]
+        self.data_handler.remove_subscription(url, channel)
+        self._request_save()
+        self._remove_job(url, channel)
         return "移除成功。"
 
-    def _cmd_change(self, event: AstrMessageEvent, args: List[str]) -> str:
+    async def _cmd_change(self, event: AstrMessageEvent, args: List[str]) -> str:
         if len(args) < 1:
             return "用法: /rss change <list-index> [cron exp]"
 
@@ -314,11 +332,12 @@ class SimpleRSSPlugin(Star):
         if idx >= len(subs):
             return "索引越界，请先用 /rss ls 查看序号。"
 
-        _, _, sub = subs[idx]
+        url, _, sub = subs[idx]
         sub["cron_expr"] = cron_expr
 
-        self.data_handler.save_data()
-        self._refresh_scheduler()
+        self.data_handler.mark_dirty()
+        self._request_save()
+        self._add_or_update_job(url, channel, cron_expr)
         return f"更新成功，新的 cron: {cron_expr}"
 
     async def _cmd_get(self, event: AstrMessageEvent, args: List[str]) -> List[str]:
@@ -353,19 +372,28 @@ class SimpleRSSPlugin(Star):
                 return ["索引越界，请先用 /rss ls 查看序号。"]
             selected = [subs[idx]]
 
+        results = await asyncio.gather(
+            *(self._fetch_limited(url, number) for url, _, _ in selected),
+            return_exceptions=True,
+        )
+
+        dirty = False
         outputs: List[str] = []
-        for url, feed, _ in selected:
+        for (url, feed, _), result in zip(selected, results):
             title = feed.get("title") or url
-            try:
-                fetched_title, fetched_desc, items = await self.rss_client.fetch(url, limit=number)
-            except Exception as exc:
-                outputs.append(f"[{title}] 拉取失败: {exc}")
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                outputs.append(f"[{title}] 拉取失败: {result}")
                 continue
+            fetched_title, fetched_desc, items = result
 
-            if fetched_title:
+            if fetched_title and feed.get("title") != fetched_title:
                 feed["title"] = fetched_title
-            if fetched_desc:
+                dirty = True
+            if fetched_desc and feed.get("description") != fetched_desc:
                 feed["description"] = fetched_desc
+                dirty = True
 
             if not items:
                 outputs.append(f"[{title}] 暂无可用内容。")
@@ -373,9 +401,15 @@ class SimpleRSSPlugin(Star):
 
             outputs.append(self._format_get_output(feed.get("title") or title, url, items, number))
 
-        self.data_handler.save_data()
+        if dirty:
+            self.data_handler.mark_dirty()
+            self._request_save()
         return outputs
 
+    async def _fetch_limited(self, url: str, limit: int) -> Tuple[str, str, List[RSSItem]]:
+        async with self._poll_sem:
+            return await self.rss_client.fetch(url, limit=limit)
+
     def _format_get_output(self, title: str, url: str, items: List[RSSItem], number: int) -> str:
         picked_items = items[:number]
         lines = [f"来自 [{title}]: [{url}]"]
@@ -389,34 +423,43 @@ class SimpleRSSPlugin(Star):
         return "\n".join(lines)
 
     async def _scheduled_poll(self, url: str, channel: str):
-        feeds = self.data_handler.data.get("feeds", {})
-        feed = feeds.get(url)
-        if not isinstance(feed, dict):
-            return
-
-        subscribers = feed.get("subscribers", {})
-        if not isinstance(subscribers, dict) or channel not in subscribers:
-            return
-
-        sub = subscribers[channel]
-        if not isinstance(sub, dict):
+        entry = self.data_handler.get_subscription(url, channel)
+        if entry is None:
             return
+        _, feed, sub = entry
 
         try:
-            title, description, items = await self.rss_client.fetch(
-                url, limit=self.poll_fetch_count
-            )
+            async with self._poll_sem:
+                (title, description, items), etag, last_modified = (
+                    await self.rss_client.fetch_conditional(
+                        url,
+                        limit=self.poll_fetch_count,
+                        etag=sub.get("etag", ""),
+                        last_modified=sub.get("last_modified", ""),
+                    )
+                )
+        except NotModified:
+            return
         except Exception as exc:
             logger.warning(f"rss 定时拉取失败: {url} - {channel} - {exc}")
             return
 
-        if title:
+        if title and feed.get("title") != title:
             feed["title"] = title
-        if description:
+            self.data_handler.mark_dirty()
+        if description and feed.get("description") != description:
             feed["description"] = description
+            self.data_handler.mark_dirty()
+
+        if (etag, last_modified) != (sub.get("etag", ""), sub.get("last_modified", "")):
+            sub["etag"] = etag
+            sub["last_modified"] = last_modified
+            self.data_handler.mark_dirty()
 
         new_items = self._collect_new_items(items, sub)
         if not new_items:
+            if self.data_handler.is_dirty():
+                self._request_save()
             return
 
         text = self._format_push_message(feed.get("title") or url, new_items)
@@ -427,7 +470,8 @@ class SimpleRSSPlugin(Star):
             logger.warning(f"rss 推送失败: {url} - {channel} - {exc}")
 
         self._update_subscription_checkpoint(sub, new_items)
-        self.data_handler.save_data()
+        self.data_handler.mark_dirty()
+        self._request_save()
 
     def _format_push_message(self, title: str, items: List[RSSItem]) -> str:
         ordered_items = list(reversed(items))
@@ -446,9 +490,7 @@ class SimpleRSSPlugin(Star):
     def _format_item_time(self, item: RSSItem) -> str:
         if item.published_ts > 0:
             try:
-                return datetime.fromtimestamp(
-                    item.published_ts, tz=self.display_tz
-                ).strftime("%Y.%m.%d %H:%M:%S")
+                return _fmt_ts(item.published_ts, self.display_tz)
             except Exception:
                 pass
 
@@ -457,21 +499,18 @@ class SimpleRSSPlugin(Star):
         return "未知时间"
 
     def _collect_new_items(self, items: List[RSSItem], sub: Dict[str, Any]) -> List[RSSItem]:
-        recent_ids = sub.get("recent_ids", [])
-        if not isinstance(recent_ids, list):
-            recent_ids = []
-
-        recent_id_set = {str(x) for x in recent_ids if isinstance(x, str) and x}
+        recent_id_set = sub.get("_recent_set")
+        if recent_id_set is None:
+            recent_id_set = sub["_recent_set"] = set(sub.get("recent_ids") or ())
         last_update = int(sub.get("last_update") or 0)
 
-        new_items: List[RSSItem] = []
-        for item in items:
-            if item.uid in recent_id_set:
-                continue
-            if item.published_ts and item.published_ts < last_update:
-                continue
-            new_items.append(item)
-        return new_items
+        # the timestamp check is a plain int compare; uid builds a string, so test it last
+        return [
+            item
+            for item in items
+            if not (item.published_ts and item.published_ts < last_update)
+            and item.uid not in recent_id_set
+        ]
 
     def _update_subscription_checkpoint(self, sub: Dict[str, Any], new_items: List[RSSItem]) -> None:
         current_last = int(sub.get("last_update") or 0)
@@ -480,57 +519,54 @@ class SimpleRSSPlugin(Star):
             if item.published_ts > next_last:
                 next_last = item.published_ts
 
-        merged: List[str] = []
-        for uid in [x.uid for x in new_items] + list(sub.get("recent_ids", [])):
-            if isinstance(uid, str) and uid and uid not in merged:
-                merged.append(uid)
+        recent = sub["recent_ids"]
+        recent_set = sub["_recent_set"]
+        for item in reversed(new_items):
+            uid = item.uid
+            if not uid or uid in recent_set:
+                continue
+            if len(recent) == recent.maxlen:
+                recent_set.discard(recent[-1])
+            recent.appendleft(uid)
+            recent_set.add(uid)
 
         sub["last_update"] = next_last
-        sub["recent_ids"] = merged[: self.init_fetch_count]
 
     def _refresh_scheduler(self) -> None:
-        if not self.scheduler.running:
-            return
-
         self.scheduler.remove_all_jobs()
-        feeds = self.data_handler.data.get("feeds", {})
-        if not isinstance(feeds, dict):
+        for url, channel, sub in self.data_handler.iter_subscriptions():
+            cron_expr = str(sub.get("cron_expr") or self.default_cron_expr)
+            self._add_or_update_job(url, channel, cron_expr)
+
+    def _add_or_update_job(self, url: str, channel: str, cron_expr: str) -> None:
+        ok, error = validate_cron_expr(cron_expr)
+        if not ok:
+            logger.warning(f"cron 无效，跳过任务: {cron_expr} ({error})")
             return
 
-        for url, feed in feeds.items():
-            if not isinstance(feed, dict):
-                continue
-            subscribers = feed.get("subscribers", {})
-            if not isinstance(subscribers, dict):
-                continue
+        trigger_kwargs = parse_cron_expr(cron_expr)
+        job_id = self._job_id(url, channel)
+        try:
+            self.scheduler.add_job(
+                self._scheduled_poll,
+                "cron",
+                id=job_id,
+                replace_existing=True,
+                args=[url, channel],
+                **trigger_kwargs,
+            )
+        except Exception as exc:
+            logger.warning(f"添加定时任务失败: {url} - {channel} - {exc}")
 
-            for channel, sub in subscribers.items():
-                if not isinstance(sub, dict):
-                    continue
-
-                cron_expr = str(sub.get("cron_expr") or self.default_cron_expr)
-                ok, error = validate_cron_expr(cron_expr)
-                if not ok:
-                    logger.warning(f"cron 无效，跳过任务: {cron_expr} ({error})")
-                    continue
-
-                trigger_kwargs = parse_cron_expr(cron_expr)
-                job_id = self._job_id(url, channel)
-                try:
-                    self.scheduler.add_job(
-                        self._scheduled_poll,
-                        "cron",
-                        id=job_id,
-                        replace_existing=True,
-                        args=[url, channel],
-                        **trigger_kwargs,
-                    )
-                except Exception as exc:
-                    logger.warning(f"添加定时任务失败: {url} - {channel} - {exc}")
+    def _remove_job(self, url: str, channel: str) -> None:
+        try:
+            self.scheduler.remove_job(self._job_id(url, channel))
+        except JobLookupError:
+            pass
 
     def _job_id(self, url: str, channel: str) -> str:
         raw = f"{url}|{channel}".encode("utf-8", errors="ignore")
-        return "rss-" + hashlib.md5(raw).hexdigest()
+        return "rss-" + hashlib.blake2b(raw, digest_size=12).hexdigest()
 
     def _parse_index(self, value: str) -> Optional[int]:
         try:
@@ -1,9 +1,11 @@
+import asyncio
 import re
-import xml.etree.ElementTree as ET
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
 from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from html import unescape
-from typing import Any, List, Optional, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse
 
 import aiohttp
@@ -11,22 +13,219 @@ from astrbot.api import logger
 
 from .rss import RSSItem
 
+try:
+    from lxml import etree as ET
+
+    HAS_LXML = True
+except ImportError:  # lxml is optional; fall back to the stdlib parser
+    import xml.etree.ElementTree as ET
+
+    HAS_LXML = False
+
+STREAM_CHUNK_SIZE = 16384
+# recover=True lets lxml build a tree from HTML pages too; only accept real feed roots
+FEED_ROOT_NAMES = ("rss", "feed", "RDF")
+# namespaced tag -> local name; feeds use a handful of tags, the bound only guards odd input
+TAG_CACHE_SIZE = 512
+
+_SCHEME_RE = re.compile(r"^https?://", re.IGNORECASE)
+_BR_RE = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_NL_RE = re.compile(r"\n{3,}")
+_WS_RE = re.compile(r"[ \t]{2,}")
+
+_RFC822_RE = re.compile(
+    r"^(?:[A-Za-z]{3},\s*)?(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})\s+"
+    r"(\d{1,2}):(\d{2})(?::(\d{2}))?"
+    r"(?:\s*(?:([+-])(\d{2}):?(\d{2})|GMT|UTC|UT|Z))?$"
+)
+_MONTHS = {
+    "jan": 1,
+    "feb": 2,
+    "mar": 3,
+    "apr": 4,
+    "may": 5,
+    "jun": 6,
+    "jul": 7,
+    "aug": 8,
+    "sep": 9,
+    "oct": 10,
+    "nov": 11,
+    "dec": 12,
+}
+
+FeedResult = Tuple[str, str, List[RSSItem]]
+# (result, etag, last_modified)
+FetchOutcome = Tuple[FeedResult, str, str]
+
+
+class NotModified(Exception):
+    pass
+
+
+def _parse_rfc822(value: str) -> Optional[datetime]:
+    match = _RFC822_RE.match(value)
+    if match is None:
+        return None
+    day, month_name, year, hour, minute, second, sign, tz_hour, tz_minute = match.groups()
+    month = _MONTHS.get(month_name.lower())
+    if month is None:
+        return None
+
+    tz = timezone.utc
+    if sign:
+        offset = timedelta(hours=int(tz_hour), minutes=int(tz_minute))
+        tz = timezone(-offset if sign == "-" else offset)
+    return datetime(
+        int(year), month, int(day), int(hour), int(minute), int(second or 0), tzinfo=tz
+    )
+
+
+@lru_cache(maxsize=128)
+def _parse_timestamp(value: str) -> int:
+    # Atom feeds use ISO-8601 and RSS feeds mostly use the canonical RFC-822 form,
+    # so both are tried before the much slower email.utils tokenizer.
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            dt = _parse_rfc822(value)
+        except ValueError:
+            dt = None
+        if dt is None:
+            try:
+                dt = parsedate_to_datetime(value)
+            except Exception:
+                return 0
+            if dt is None:
+                return 0
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    try:
+        return int(dt.timestamp())
+    except Exception:
+        return 0
+
+
+class _FeedStream:
+    def __init__(self, client: "RSSClient", base_url: str, limit: int):
+        self._client = client
+        self._base_url = base_url
+        self._limit = limit
+        self._parser = client._new_pull_parser()
+        self._stack: List[ET.Element] = []
+        self._channel_info: Dict[str, str] = {}
+        self._root_info: Dict[str, str] = {}
+        self._has_channel = False
+        self.root: Optional[ET.Element] = None
+        self.items: List[RSSItem] = []
+        self.done = False
+
+    @property
+    def title(self) -> str:
+        info = self._channel_info if self._has_channel else self._root_info
+        return info.get("title", "")
+
+    @property
+    def description(self) -> str:
+        info = self._channel_info if self._has_channel else self._root_info
+        return info.get("description", "")
+
+    def feed(self, chunk: bytes) -> None:
+        self._parser.feed(chunk)
+        self._drain()
+
+    def close(self) -> None:
+        self._parser.close()
+        self._drain()
+
+    def _drain(self) -> None:
+        local_name = self._client._local_name
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self.root is None:
+                    self.root = elem
+                if not self._has_channel and local_name(elem.tag) == "channel":
+                    self._has_channel = True
+                self._stack.append(elem)
+                continue
+
+            self._stack.pop()
+            name = local_name(elem.tag)
+            if name in ("item", "entry"):
+                parsed = self._client._parse_item_node(elem, base_url=self._base_url)
+                elem.clear()
+                if parsed is None:
+                    continue
+                self.items.append(parsed)
+                if 0 < self._limit <= len(self.items):
+                    self.done = True
+                    return
+                continue
+
+            if not self._stack:
+                continue
+            if local_name(self._stack[-1].tag) == "channel":
+                if name in ("title", "description"):
+                    self._remember(self._channel_info, name, elem)
+            elif len(self._stack) == 1:
+                if name == "title":
+                    self._remember(self._root_info, "title", elem)
+                elif name in ("subtitle", "description"):
+                    self._remember(self._root_info, "description", elem)
+
+    def _remember(self, info: Dict[str, str], key: str, elem: ET.Element) -> None:
+        if key in info:
+            return
+        text = "".join(elem.itertext()).strip()
+        if text:
+            info[key] = text
+
 
 class RSSClient:
     def __init__(
         self,
         user_agent: str = "astrbot-plugin-simple-rss/1.1.0",
         desc_max_length: int = 150,
+        cache_ttl: float = 30.0,
     ):
         self.user_agent = user_agent
         self.desc_max_length = desc_max_length
+        self.cache_ttl = cache_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        # url -> (limit, (etag, last_modified), task) for fetches currently on the wire
+        self._inflight: Dict[
+            str, Tuple[int, Tuple[str, str], "asyncio.Task[FetchOutcome]"]
+        ] = {}
+        # url -> (expires_at, limit, outcome) for recently fetched feeds
+        self._cache: Dict[str, Tuple[float, int, FetchOutcome]] = {}
+        self._tag_cache: Dict[Any, str] = {}
+
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                trust_env=True,
+                timeout=aiohttp.ClientTimeout(total=30, connect=10),
+                headers={"User-Agent": self.user_agent},
+                connector=aiohttp.TCPConnector(ssl=False, limit=32, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        for _, _, task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     def normalize_url(self, value: str) -> str:
         raw = (value or "").strip()
         if not raw:
             return ""
 
-        if not re.match(r"^https?://", raw, flags=re.IGNORECASE):
+        if not _SCHEME_RE.match(raw):
             raw = "https://" + raw
 
         parsed = urlparse(raw)
@@ -38,72 +237,134 @@ class RSSClient:
             normalized += f"?{parsed.query}"
         return normalized
 
-    async def fetch(self, url: str, limit: int) -> Tuple[str, str, List[RSSItem]]:
-        body = await self._fetch_url_bytes(url)
-        if body is None:
-            raise RuntimeError("请求失败")
+    async def fetch(self, url: str, limit: int) -> FeedResult:
+        result, _, _ = await self.fetch_conditional(url, limit)
+        return result
 
+    async def fetch_conditional(
+        self,
+        url: str,
+        limit: int,
+        etag: str = "",
+        last_modified: str = "",
+    ) -> FetchOutcome:
+        validators = (etag or "", last_modified or "")
+        cached = self._cache.get(url)
+        if cached is not None and cached[0] > time.monotonic() and self._covers(cached[1], limit):
+            return self._check_outcome(url, cached[2], validators, limit)
+
+        inflight = self._inflight.get(url)
+        if (
+            inflight is not None
+            and self._covers(inflight[0], limit)
+            and inflight[1] in {("", ""), validators}
+        ):
+            outcome = await asyncio.shield(inflight[2])
+            return self._check_outcome(url, outcome, validators, limit)
+
+        task = asyncio.ensure_future(self._fetch_and_cache(url, limit, validators))
+        entry = (limit, validators, task)
+        self._inflight[url] = entry
+
+        def _done(done: "asyncio.Task[FetchOutcome]") -> None:
+            if self._inflight.get(url) is entry:
+                del self._inflight[url]
+            # shielded callers may all have been cancelled; consume the result here
+            if not done.cancelled():
+                done.exception()
+
+        task.add_done_callback(_done)
+        return self._check_outcome(url, await asyncio.shield(task), validators, limit)
+
+    def _covers(self, fetched_limit: int, limit: int) -> bool:
+        return fetched_limit <= 0 or 0 < limit <= fetched_limit
+
+    def _same_version(self, known: Tuple[str, str], current: Tuple[str, str]) -> bool:
+        if known[0] and current[0]:
+            return known[0] == current[0]
+        if known[1] and current[1]:
+            return known[1] == current[1]
+        return False
+
+    def _check_outcome(
+        self,
+        url: str,
+        outcome: FetchOutcome,
+        validators: Tuple[str, str],
+        limit: int,
+    ) -> FetchOutcome:
+        (title, description, items), etag, last_modified = outcome
+        if self._same_version(validators, (etag, last_modified)):
+            raise NotModified(url)
+        items = items[:limit] if limit > 0 else list(items)
+        return (title, description, items), etag, last_modified
+
+    async def _fetch_and_cache(
+        self, url: str, limit: int, validators: Tuple[str, str]
+    ) -> FetchOutcome:
+        outcome = await self._fetch_uncached(url, limit, validators)
+        now = time.monotonic()
+        for key in [k for k, v in self._cache.items() if v[0] <= now]:
+            del self._cache[key]
+        self._cache[url] = (now + self.cache_ttl, limit, outcome)
+        return outcome
+
+    async def _fetch_uncached(
+        self, url: str, limit: int, validators: Tuple[str, str]
+    ) -> FetchOutcome:
+        etag, last_modified = validators
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        stream = _FeedStream(self, base_url=url, limit=limit)
         try:
-            root = ET.fromstring(body)
+            session = await self._ensure_session()
+            async with session.get(url, headers=headers) as resp:
+                if resp.status == 304:
+                    raise NotModified(url)
+                if resp.status != 200:
+                    raise RuntimeError(f"HTTP {resp.status}")
+                # stop reading once enough items are parsed; the connection is dropped on exit
+                async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    stream.feed(chunk)
+                    if stream.done:
+                        break
+                else:
+                    stream.close()
+                etag = resp.headers.get("ETag", "")
+                last_modified = resp.headers.get("Last-Modified", "")
+        except NotModified:
+            raise
         except ET.ParseError as exc:
             raise RuntimeError(f"XML 解析失败: {exc}")
-
-        title, description = self._extract_feed_info(root)
-        items = self._extract_items(root, base_url=url, limit=limit)
-        return title, description, items
-
-    async def _fetch_url_bytes(self, url: str) -> Optional[bytes]:
-        timeout = aiohttp.ClientTimeout(total=30, connect=10)
-        headers = {"User-Agent": self.user_agent}
-        connector = aiohttp.TCPConnector(ssl=False)
-        try:
-            async with aiohttp.ClientSession(
-                trust_env=True,
-                timeout=timeout,
-                headers=headers,
-                connector=connector,
-            ) as session:
-                async with session.get(url) as resp:
-                    if resp.status != 200:
-                        raise RuntimeError(f"HTTP {resp.status}")
-                    return await resp.read()
         except Exception as exc:
             logger.warning(f"请求 RSS 失败: {url} - {exc}")
-            return None
-
-    def _extract_feed_info(self, root: ET.Element) -> Tuple[str, str]:
-        channel = self._first_node(root, {"channel"})
-        if channel is not None:
-            title = self._direct_child_text(channel, {"title"})
-            description = self._direct_child_text(channel, {"description"})
-            return title, description
-
-        title = self._direct_child_text(root, {"title"})
-        description = self._direct_child_text(root, {"subtitle", "description"})
-        return title, description
-
-    def _extract_items(self, root: ET.Element, base_url: str, limit: int) -> List[RSSItem]:
-        nodes: List[ET.Element] = []
-        for elem in root.iter():
-            name = self._local_name(elem.tag)
-            if name in {"item", "entry"}:
-                nodes.append(elem)
-
-        items: List[RSSItem] = []
-        for node in nodes:
-            parsed = self._parse_item_node(node, base_url=base_url)
-            if parsed is None:
-                continue
-            items.append(parsed)
-            if limit > 0 and len(items) >= limit:
-                break
+            raise RuntimeError("请求失败")
 
-        return items
+        if stream.root is None:
+            raise RuntimeError("XML 解析失败: 空文档")
+        if self._local_name(stream.root.tag) not in FEED_ROOT_NAMES:
+            raise RuntimeError("XML 解析失败: 不是 RSS/Atom 文档")
+        return (stream.title, stream.description, stream.items), etag, last_modified
+
+    def _new_pull_parser(self) -> Any:
+        if HAS_LXML:
+            return ET.XMLPullParser(
+                events=("start", "end"),
+                recover=True,
+                huge_tree=False,
+                resolve_entities=False,
+                no_network=True,
+            )
+        return ET.XMLPullParser(events=("start", "end"))
 
     def _parse_item_node(self, node: ET.Element, base_url: str) -> Optional[RSSItem]:
         title = self._direct_child_text(node, {"title"}) or "无标题"
         link = self._extract_item_link(node)
-        if link and not re.match(r"^https?://", link, flags=re.IGNORECASE):
+        if link and not _SCHEME_RE.match(link):
             link = urljoin(base_url, link)
 
         summary = self._direct_child_text(
@@ -151,51 +412,31 @@ class RSSClient:
                     return text
         return ""
 
-    def _first_node(self, root: ET.Element, names: Set[str]) -> Optional[ET.Element]:
-        for elem in root.iter():
-            if self._local_name(elem.tag) in names:
-                return elem
-        return None
-
     def _local_name(self, tag: Any) -> str:
-        if not isinstance(tag, str):
-            return ""
-        if "}" in tag:
-            return tag.rsplit("}", 1)[-1]
-        return tag
+        cached = self._tag_cache.get(tag)
+        if cached is not None:
+            return cached
+        name = tag[tag.rfind("}") + 1 :] if isinstance(tag, str) else ""
+        if len(self._tag_cache) >= TAG_CACHE_SIZE:
+            self._tag_cache.clear()
+        self._tag_cache[tag] = name
+        return name
 
     def _strip_html(self, html: str) -> str:
         text = html or ""
-        text = re.sub(r"<br\\s*/?>", "\n", text, flags=re.IGNORECASE)
-        text = re.sub(r"<[^>]+>", "", text)
+        text = _BR_RE.sub("\n", text)
+        text = _TAG_RE.sub("", text)
         text = unescape(text)
-        text = re.sub(r"\r", "", text)
-        text = re.sub(r"\n{3,}", "\n\n", text)
-        text = re.sub(r"[ \t]{2,}", " ", text)
+        text = text.replace("\r", "")
+        text = _NL_RE.sub("\n\n", text)
+        text = _WS_RE.sub(" ", text)
         return text.strip()
 
     def _parse_datetime(self, raw: str) -> int:
         value = (raw or "").strip()
         if not value:
             return 0
-
-        try:
-            dt = parsedate_to_datetime(value)
-            if dt is not None:
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                return int(dt.timestamp())
-        except Exception:
-            pass
-
-        try:
-            iso = value.replace("Z", "+00:00")
-            dt = datetime.fromisoformat(iso)
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return int(dt.timestamp())
-        except Exception:
-            return 0
+        return _parse_timestamp(value)
 
     def _truncate_desc(self, text: str) -> str:
         if self.desc_max_length < 0: